@@ -0,0 +1,114 @@
+"""Numba kernels for the statistics page, kept out of the Streamlit script so numba's
+on-disk cache can re-import them without re-running the app"""
+import numpy as np
+from _njit import njit, prange
+
+@njit(cache=True, parallel=True)
+def reduce_all(metrics, always_positive):
+    """Reduce every metric row of an M x N matrix in parallel, skipping NaN/inf values"""
+    n_metrics, n_bars = metrics.shape
+    table = np.zeros((n_metrics, 10))
+
+    for j in prange(n_metrics):
+        row = metrics[j]
+
+        # Single pass: count, min, max and Welford's running mean / sum of squared deviations
+        count = 0
+        mean_val = 0.0
+        squares = 0.0
+        min_val = np.inf
+        max_val = -np.inf
+        for i in range(n_bars):
+            x = row[i]
+            if np.isfinite(x):
+                count += 1
+                delta = x - mean_val
+                mean_val += delta / count
+                squares += delta * (x - mean_val)
+                min_val = min(min_val, x)
+                max_val = max(max_val, x)
+
+        # Metrics without data report zeros
+        if count == 0:
+            continue
+
+        # Sample standard deviation; a single observation has no spread (pandas would report NaN)
+        std_val = np.sqrt(squares / (count - 1)) if count > 1 else 0.0
+
+        table[j, 0] = min_val
+        table[j, 1] = max_val
+        table[j, 2] = mean_val
+        table[j, 3] = std_val
+        for k in range(3):
+            lower = mean_val - (k + 1) * std_val
+            # For metrics that are always positive, don't let lower bound go negative
+            if always_positive[j] and lower < 0:
+                lower = 0.0
+            table[j, 4 + 2 * k] = lower
+            table[j, 5 + 2 * k] = mean_val + (k + 1) * std_val
+
+    return table
+
+@njit(cache=True, error_model='numpy')
+def compute_derived(open_, high, low, close, pullback_threshold, pullback_type_is_body):
+    """Compute every per-candle derived column in a single fused loop over the bars"""
+    # Outputs keep the precision of the inputs (float32 prices stay float32) and share
+    # one contiguous scratch block, one row per derived column
+    n = open_.shape[0]
+    scratch = np.empty((14, n), open_.dtype)
+    range_pts = scratch[0]
+    range_pct = scratch[1]
+    body_pts = scratch[2]
+    body_pct = scratch[3]
+    gap_pts = scratch[4]
+    gap_pct = scratch[5]
+    change_prev_pts = scratch[6]
+    change_prev_pct = scratch[7]
+    change_open_pts = scratch[8]
+    change_open_pct = scratch[9]
+    green_pullback_pts = scratch[10]
+    green_pullback_pct = scratch[11]
+    red_pullback_pts = scratch[12]
+    red_pullback_pct = scratch[13]
+    # Pullback rows stay NaN unless the candle meets the threshold
+    scratch[10:] = np.nan
+    # Candle direction from open: 1 green, -1 red, 0 flat or missing
+    direction = np.zeros(n, np.int8)
+
+    for i in range(n):
+        # Range (High - Low) and body (|Close - Open|) - don't need previous data
+        range_pts[i] = high[i] - low[i]
+        range_pct[i] = (range_pts[i] / open_[i]) * 100
+        change_open_pts[i] = close[i] - open_[i]
+        change_open_pct[i] = (change_open_pts[i] / open_[i]) * 100
+        body_pts[i] = abs(change_open_pts[i])
+        body_pct[i] = (body_pts[i] / open_[i]) * 100
+        if change_open_pts[i] > 0:
+            direction[i] = 1
+        elif change_open_pts[i] < 0:
+            direction[i] = -1
+
+        # Gap and change from previous close - the first bar has no previous close
+        prev = close[i - 1] if i > 0 else np.nan
+        gap_pts[i] = open_[i] - prev
+        gap_pct[i] = (gap_pts[i] / prev) * 100
+        change_prev_pts[i] = close[i] - prev
+        change_prev_pct[i] = (change_prev_pts[i] / prev) * 100
+
+        # Pullback in the next candle when this candle meets the threshold
+        if i + 1 < n:
+            size = body_pct[i] if pullback_type_is_body else range_pct[i]
+            if size >= pullback_threshold:
+                if direction[i] == 1:
+                    # Green candle - how low the next candle goes
+                    green_pullback_pts[i] = low[i + 1] - close[i]
+                    green_pullback_pct[i] = (green_pullback_pts[i] / close[i]) * 100
+                elif direction[i] == -1:
+                    # Red candle - how high the next candle goes
+                    red_pullback_pts[i] = high[i + 1] - close[i]
+                    red_pullback_pct[i] = (red_pullback_pts[i] / close[i]) * 100
+
+    return (range_pts, range_pct, body_pts, body_pct,
+            gap_pts, gap_pct, change_prev_pts, change_prev_pct,
+            change_open_pts, change_open_pct, direction,
+            green_pullback_pts, green_pullback_pct, red_pullback_pts, red_pullback_pct)
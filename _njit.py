@@ -0,0 +1,18 @@
+"""Optional Numba JIT decorators with a no-op fallback when numba is not installed"""
+try:
+    from numba import config, njit, prange
+    NUMBA_AVAILABLE = True
+
+    # Streamlit runs the kernels from its script threads; OpenMP is thread safe and, unlike
+    # TBB, does not keep the interpreter alive after parallel calls from those threads
+    config.THREADING_LAYER_PRIORITY = ['omp', 'tbb', 'workqueue']
+except ImportError:
+    NUMBA_AVAILABLE = False
+
+    def njit(*args, **kwargs):
+        # Support both @njit and @njit(cache=True, ...) forms
+        if len(args) == 1 and callable(args[0]) and not kwargs:
+            return args[0]
+        return lambda func: func
+
+    prange = range
@@ -1,9 +1,13 @@
 import streamlit as st
 import pandas as pd
 import numpy as np
-import yfinance as yf
 from datetime import datetime, timedelta
+import hashlib
+import time
 import warnings
+from pathlib import Path
+from _njit import NUMBA_AVAILABLE
+from _kernels import compute_derived, reduce_all
 warnings.filterwarnings('ignore')
 
 # Page configuration
@@ -13,335 +17,430 @@ st.set_page_config(
     layout="wide"
 )
 
+# Downloaded data is also kept on disk so restarts and new sessions skip Yahoo
+CACHE_DIR = Path(__file__).parent / '.cache'
+CACHE_TTL_SECONDS = 24 * 60 * 60
+# Ranges that ended this long ago get no new bars and can be kept longer, but not
+# forever: prices are split/dividend adjusted, so later corporate actions rewrite them
+SETTLED_AFTER = timedelta(days=7)
+SETTLED_CACHE_TTL_SECONDS = 3 * 24 * 60 * 60
+
+def cache_ttl(end_date):
+    """Seconds a cached range stays fresh"""
+    if end_date < datetime.now().date() - SETTLED_AFTER:
+        return SETTLED_CACHE_TTL_SECONDS
+    return CACHE_TTL_SECONDS
+
+def is_cache_fresh(cache_path, ttl=CACHE_TTL_SECONDS):
+    """Whether the parquet file exists and is still fresh, judged by its mtime alone"""
+    try:
+        age = time.time() - cache_path.stat().st_mtime
+    except OSError:
+        return False
+    return age < ttl
+
+def read_cached_data(cache_path, ttl=CACHE_TTL_SECONDS):
+    """Return cached data if the parquet file exists and is still fresh"""
+    if not is_cache_fresh(cache_path, ttl):
+        return None
+    try:
+        return pd.read_parquet(cache_path)
+    except (OSError, ImportError, ValueError):
+        return None
+
+def write_cached_data(cache_path, data):
+    """Store downloaded data as parquet, ignoring failures since the cache is optional"""
+    try:
+        cache_path.parent.mkdir(parents=True, exist_ok=True)
+        data.to_parquet(cache_path, compression='zstd')
+    except (OSError, ImportError, ValueError):
+        pass
+
+# Statistics are reported to one decimal, so prices are kept as float32 from download on
+PRICE_COLUMNS = ['Open', 'High', 'Low', 'Close']
+
+# Index fetched alongside the selected symbol so switching to it later hits the cache
+BENCHMARK_SYMBOL = "^NSEI"
+
+def cache_path_for(symbol, buffer_start, end_date):
+    """Parquet cache file for one symbol and date range"""
+    cache_key = hashlib.md5(f"{symbol}|{buffer_start}|{end_date}".encode()).hexdigest()
+    return CACHE_DIR / f"{cache_key}.parquet"
+
+def download_symbols(symbols, start, end):
+    """Download several symbols in one threaded yfinance request, split per symbol"""
+    # yfinance is heavy to import and only needed on a disk cache miss
+    import yfinance as yf
+
+    # yfinance keeps one shared HTTP session internally, so batching the symbols
+    # here also reuses its connection instead of a handshake per Ticker. Prices stay
+    # split/dividend adjusted as Ticker.history returned them; actions are not needed
+    data = yf.download(symbols, start=start, end=end, group_by='ticker', auto_adjust=True,
+                       actions=False, threads=len(symbols) > 1, progress=False)
+    frames = {}
+    for symbol in symbols:
+        if isinstance(data.columns, pd.MultiIndex):
+            if symbol not in data.columns.get_level_values(0):
+                continue
+            frame = data[symbol]
+        else:
+            frame = data
+        # Keep only the columns the dashboard reads
+        frame = frame[PRICE_COLUMNS + ['Volume']].dropna(how='all')
+        frame = frame.astype({column: np.float32 for column in PRICE_COLUMNS})
+        if not frame.empty:
+            frames[symbol] = frame
+    return frames
+
 @st.cache_data
 def load_data(symbol, start_date, end_date):
     """Load stock data from Yahoo Finance with extra buffer for previous day calculations"""
     try:
+        # yf.download upper-cases tickers, so normalise first for both its columns and the cache key
+        symbol = symbol.strip().upper()
+
         # Add buffer days to get previous data for gap calculations
         buffer_start = start_date - timedelta(days=10)  # Buffer for weekends/holidays
-        ticker = yf.Ticker(symbol)
-        data = ticker.history(start=buffer_start, end=end_date)
-        if data.empty:
-            return None
-        return data
+
+        ttl = cache_ttl(end_date)
+        data = read_cached_data(cache_path_for(symbol, buffer_start, end_date), ttl)
+        if data is not None:
+            return data
+
+        # Prefetch the benchmark index in the same request unless it is already on disk
+        symbols = [symbol]
+        if symbol != BENCHMARK_SYMBOL and not is_cache_fresh(
+                cache_path_for(BENCHMARK_SYMBOL, buffer_start, end_date), ttl):
+            symbols.append(BENCHMARK_SYMBOL)
+
+        frames = download_symbols(symbols, buffer_start, end_date)
+        for fetched_symbol, frame in frames.items():
+            write_cached_data(cache_path_for(fetched_symbol, buffer_start, end_date), frame)
+        return frames.get(symbol)
     except Exception as e:
         st.error(f"Error loading data for {symbol}: {e}")
         return None
 
+def session_data(symbol, start_date, end_date):
+    """Load data once per session and reuse it, skipping the st.cache_data copy on reruns"""
+    # Only the latest load is kept so a long session does not pile up frames
+    key = (symbol, start_date, end_date)
+    cached = st.session_state.get('loaded_data')
+    if cached is not None and cached[0] == key:
+        return cached[1]
+
+    data = load_data(symbol, start_date, end_date)
+    if data is not None:
+        st.session_state['loaded_data'] = (key, data)
+    return data
+
+@st.cache_data(show_spinner=False)
 def resample_data(data, frequency, start_day):
     """Resample data to weekly or monthly based on starting day"""
+    if data.empty:
+        return data
+
+    # Bin on wall-clock time so neither the timezone nor a DST change moves a bar
+    index = data.index
+    tz = index.tz
+    wall = index.tz_localize(None) if tz is not None else index
+
+    shift = None
     if frequency == "Weekly":
         # Map day names to numbers (Monday=0, Sunday=6)
         day_map = {'Monday': 'W-MON', 'Tuesday': 'W-TUE', 'Wednesday': 'W-WED',
                   'Thursday': 'W-THU', 'Friday': 'W-FRI', 'Saturday': 'W-SAT', 'Sunday': 'W-SUN'}
         freq = day_map[start_day]
     else:  # Monthly
-        freq = 'MS' if start_day == 1 else 'MS'
-
-    # Resample OHLC data
-    resampled = data.resample(freq).agg({
-        'Open': 'first',
-        'High': 'max',
-        'Low': 'min',
-        'Close': 'last',
-        'Volume': 'sum'
-    }).dropna()
+        freq = 'M'
+        # Months starting on a later day: shift back so each period lines up with a
+        # calendar month, then shift the labels forward again (start_day <= 28)
+        if start_day > 1:
+            shift = pd.Timedelta(days=start_day - 1)
+            wall = wall - shift
+
+    # Bin each bar by its calendar period
+    periods = wall.to_period(freq)
+
+    # Bars are sorted, so every period is a contiguous run starting where the period changes
+    codes = periods.asi8
+    starts = np.flatnonzero(np.r_[True, codes[1:] != codes[:-1]])
+    ends = np.r_[starts[1:], len(codes)] - 1
+
+    # Weekly bins are labelled by the anchor day that closes them, monthly bins by the month start
+    bins = periods[starts]
+    labels = bins.end_time.normalize() if frequency == "Weekly" else bins.start_time
+    if shift is not None:
+        labels = labels + shift
+    if tz is not None:
+        labels = labels.tz_localize(tz)
+
+    # Gather first/last prices by position and reduce each run with ufunc.reduceat
+    resampled = pd.DataFrame({
+        'Open': data['Open'].to_numpy()[starts],
+        'High': np.maximum.reduceat(data['High'].to_numpy(), starts),
+        'Low': np.minimum.reduceat(data['Low'].to_numpy(), starts),
+        'Close': data['Close'].to_numpy()[ends],
+        'Volume': np.add.reduceat(data['Volume'].to_numpy(), starts)
+    }, index=labels.rename(index.name)).dropna()
 
     return resampled
 
-# Helper function with better NaN and zero std handling
-def calc_stats(series, name, is_always_positive=False):
-    series_clean = series.replace([np.inf, -np.inf], np.nan).dropna()
-    if len(series_clean) > 0:
-        mean_val = series_clean.mean()
-        std_val = series_clean.std()
-        min_val = series_clean.min()
-        max_val = series_clean.max()
-
-        # Handle NaN or zero standard deviation
-        if pd.isna(std_val) or std_val == 0:
-            std_val = 0
-            std_ranges = {}
-            for i in [1, 2, 3]:
-                std_ranges[f'{name}_{i}std_lower'] = mean_val
-                std_ranges[f'{name}_{i}std_upper'] = mean_val
-        else:
-            # Calculate std ranges
-            std_ranges = {}
-            for i in [1, 2, 3]:
-                lower = mean_val - (i * std_val)
-                upper = mean_val + (i * std_val)
-
-                # For metrics that are always positive, don't let lower bound go negative
-                if is_always_positive and lower < 0:
-                    lower = 0
-
-                std_ranges[f'{name}_{i}std_lower'] = lower
-                std_ranges[f'{name}_{i}std_upper'] = upper
-
-        return {
-            f'{name}_min': min_val,
-            f'{name}_max': max_val,
-            f'{name}_avg': mean_val,
-            f'{name}_std': std_val,
-            **std_ranges
-        }
-
-    return {
-        f'{name}_min': 0, f'{name}_max': 0, f'{name}_avg': 0, f'{name}_std': 0,
-        f'{name}_1std_lower': 0, f'{name}_1std_upper': 0,
-        f'{name}_2std_lower': 0, f'{name}_2std_upper': 0,
-        f'{name}_3std_lower': 0, f'{name}_3std_upper': 0
-    }
-
-def calculate_statistics(data, start_date=None, end_date=None, pullback_threshold=None, pullback_type="body"):
-    """Calculate comprehensive statistics for the data"""
-    if data.empty:
-        return {}
-
+def date_position(index, day):
+    """Position of the first bar on or after a calendar day in a sorted DatetimeIndex"""
+    return index.searchsorted(pd.Timestamp(day, tz=index.tz))
+
+# Suffixes emitted for every metric, in the column order of the reduced table
+STAT_SUFFIXES = ('min', 'max', 'avg', 'std', '1std_lower', '1std_upper',
+                 '2std_lower', '2std_upper', '3std_lower', '3std_upper')
+SIGMA_LEVELS = np.array([1, 2, 3])
+
+def _reduce_all_numpy(metrics, always_positive):
+    """NumPy version of reduce_all used when numba is not installed"""
+    # One finite check serves both the inf -> NaN cleanup and the per-metric counts
+    finite = np.isfinite(metrics)
+    metrics = np.where(finite, metrics, np.nan)
+
+    counts = np.count_nonzero(finite, axis=1)
+    mins = np.nanmin(metrics, axis=1)
+    maxs = np.nanmax(metrics, axis=1)
+    means = np.nanmean(metrics, axis=1)
+    stds = np.nanstd(metrics, axis=1, ddof=1)
+
+    # Handle NaN or zero standard deviation (single observation, constant series)
+    stds = np.where(np.isnan(stds), 0, stds)
+
+    # Std ranges for every metric and sigma level in one broadcast, shape M x 3
+    spread = SIGMA_LEVELS[None, :] * stds[:, None]
+    lower = means[:, None] - spread
+    upper = means[:, None] + spread
+
+    # For metrics that are always positive, don't let lower bound go negative
+    np.maximum(lower, 0, out=lower, where=always_positive[:, None])
+
+    # One row per metric laid out as STAT_SUFFIXES; metrics without data report zeros
+    bounds = np.stack([lower, upper], axis=2).reshape(len(metrics), 6)
+    table = np.column_stack([mins, maxs, means, stds, bounds])
+    table[counts == 0] = 0
+    return table
+
+def reduce_metrics(metric_specs):
+    """Reduce all metric columns in one pass into min/max/avg/std and std ranges"""
+    names, columns, masks, signs, always_positive = zip(*metric_specs)
+
+    # Write every metric straight into one M x N matrix (one contiguous row per metric);
+    # candles outside a metric's subset stay NaN, down-side subsets are flipped positive
+    metrics = np.full((len(names), len(columns[0])), np.nan)
+    for row, values, mask, sign in zip(metrics, columns, masks, signs):
+        np.multiply(values, sign, out=row, where=True if mask is None else mask)
+
+    positive = np.asarray(always_positive, dtype=np.bool_)
+
+    if NUMBA_AVAILABLE:
+        table = reduce_all(metrics, positive)
+    else:
+        table = _reduce_all_numpy(metrics, positive)
+
+    keys = [f'{name}_{suffix}' for name in names for suffix in STAT_SUFFIXES]
+    return dict(zip(keys, table.ravel().tolist()))
+
+def price_arrays(data):
+    """Split the OHLC columns into contiguous float32 arrays"""
+    # Frames cached before prices were narrowed at download are still float64
+    return tuple(np.ascontiguousarray(data[column].to_numpy(dtype=np.float32))
+                 for column in PRICE_COLUMNS)
+
+def hash_datetime_index(index):
+    """Cache key for a DatetimeIndex, which st.cache_data cannot hash on its own"""
+    return index.asi8.tobytes(), str(index.tz)
+
+# Each entry is only a small stats dict, but its key hashes the full price arrays and
+# index (DatetimeIndex needs an explicit hash function)
+@st.cache_data(show_spinner=False, max_entries=32,
+               hash_funcs={pd.DatetimeIndex: hash_datetime_index})
+def calculate_statistics(index, open_, high, low, close, start_date=None, end_date=None,
+                         pullback_threshold=None, pullback_type="body"):
+    """Calculate comprehensive statistics for the OHLC arrays of a DatetimeIndex"""
     # Filter data to the actual date range requested (after getting buffer data)
     if start_date and end_date:
-        # Keep one day before start_date for previous close calculations
-        analysis_start = start_date - timedelta(days=1)
-        mask = (data.index.date >= analysis_start) & (data.index.date <= end_date)
-        data = data[mask]
-
-    filtered_data = data
-
-    if filtered_data.empty:
+        start = date_position(index, start_date)
+        last = date_position(index, end_date + timedelta(days=1))
+        # No candles inside the requested range - skip the kernels altogether
+        if start >= last:
+            return {}
+
+        # Keep the last bar before start_date for previous close calculations
+        first = max(start - 1, 0)
+        index = index[first:last]
+        open_, high, low, close = (column[first:last] for column in (open_, high, low, close))
+
+    if len(index) == 0:
         return {}
 
-    # Basic calculations
-    df = filtered_data.copy()
-
-    # Range calculations (High - Low) - doesn't need previous data
-    df['Range_Points'] = df['High'] - df['Low']
-    df['Range_Pct'] = (df['Range_Points'] / df['Open']) * 100
-
-    # Body calculations (abs(Close - Open)) - doesn't need previous data
-    df['Body_Points'] = abs(df['Close'] - df['Open'])
-    df['Body_Pct'] = (df['Body_Points'] / df['Open']) * 100
-
-    # Gap calculations (current open vs previous close) - needs previous data
-    df['Prev_Close'] = df['Close'].shift(1)
-    df['Gap_Points'] = df['Open'] - df['Prev_Close']
-    df['Gap_Pct'] = (df['Gap_Points'] / df['Prev_Close']) * 100
-
-    # Green/Red candles from previous close - needs previous data
-    df['Change_From_Prev_Close_Points'] = df['Close'] - df['Prev_Close']
-    df['Change_From_Prev_Close_Pct'] = (df['Change_From_Prev_Close_Points'] / df['Prev_Close']) * 100
-
-    # NET CHANGE: (current close - previous close) in points and percentage
-    df['Net_Change_Points'] = df['Close'] - df['Prev_Close']
-    df['Net_Change_Pct'] = (df['Net_Change_Points'] / df['Prev_Close']) * 100
+    # Derive range, body, gap, change and pullback columns in one pass over the bars
+    threshold = np.nan if pullback_threshold is None else float(pullback_threshold)
+    derived = compute_derived(open_, high, low, close, threshold, pullback_type == "body")
 
     # Now filter to actual requested date range (removing the buffer day)
     if start_date:
-        df = df[df.index.date >= start_date]
-
-    # Continue with calculations on filtered data
-    # Separate gap up and gap down
-    df['Gap_Up_Points'] = df['Gap_Points'].where(df['Gap_Points'] > 0, 0)
-    df['Gap_Down_Points'] = abs(df['Gap_Points'].where(df['Gap_Points'] < 0, 0))
-    df['Gap_Up_Pct'] = df['Gap_Pct'].where(df['Gap_Pct'] > 0, 0)
-    df['Gap_Down_Pct'] = abs(df['Gap_Pct'].where(df['Gap_Pct'] < 0, 0))
-
-    df['Green_From_Prev_Points'] = df['Change_From_Prev_Close_Points'].where(df['Change_From_Prev_Close_Points'] > 0, 0)
-    df['Red_From_Prev_Points'] = abs(df['Change_From_Prev_Close_Points'].where(df['Change_From_Prev_Close_Points'] < 0, 0))
-    df['Green_From_Prev_Pct'] = df['Change_From_Prev_Close_Pct'].where(df['Change_From_Prev_Close_Pct'] > 0, 0)
-    df['Red_From_Prev_Pct'] = abs(df['Change_From_Prev_Close_Pct'].where(df['Change_From_Prev_Close_Pct'] < 0, 0))
-
-    # Green/Red candles from current day open - doesn't need previous data
-    df['Change_From_Open_Points'] = df['Close'] - df['Open']
-    df['Change_From_Open_Pct'] = (df['Change_From_Open_Points'] / df['Open']) * 100
-    df['Green_From_Open_Points'] = df['Change_From_Open_Points'].where(df['Change_From_Open_Points'] > 0, 0)
-    df['Red_From_Open_Points'] = abs(df['Change_From_Open_Points'].where(df['Change_From_Open_Points'] < 0, 0))
-    df['Green_From_Open_Pct'] = df['Change_From_Open_Pct'].where(df['Change_From_Open_Pct'] > 0, 0)
-    df['Red_From_Open_Pct'] = abs(df['Change_From_Open_Pct'].where(df['Change_From_Open_Pct'] < 0, 0))
+        first = date_position(index, start_date)
+        derived = [column[first:] for column in derived]
 
-    # Pullback analysis when threshold is provided
-    if pullback_threshold is not None:
-        # Determine candle direction (green or red from open)
-        df['Candle_Direction'] = np.where(df['Change_From_Open_Points'] > 0, 'green',
-                                        np.where(df['Change_From_Open_Points'] < 0, 'red', 'flat'))
+    (range_pts, range_pct, body_pts, body_pct, gap_pts, gap_pct,
+     change_prev_pts, change_prev_pct, change_open_pts, change_open_pct, candle_direction,
+     green_pullback_pts, green_pullback_pct, red_pullback_pts, red_pullback_pct) = derived
 
-        # Get next candle's OHLC
-        df['Next_Open'] = df['Open'].shift(-1)
-        df['Next_Close'] = df['Close'].shift(-1)
-        df['Next_High'] = df['High'].shift(-1)
-        df['Next_Low'] = df['Low'].shift(-1)
+    # Sign masks shared by points and percentage metrics and the candle counts
+    gap_up_mask = gap_pts > 0
+    gap_down_mask = gap_pts < 0
+    green_prev_mask = change_prev_pts > 0
+    red_prev_mask = change_prev_pts < 0
 
-        # Determine next candle's direction
-        df['Next_Change_From_Open'] = df['Next_Close'] - df['Next_Open']
-        df['Next_Candle_Direction'] = np.where(df['Next_Change_From_Open'] > 0, 'green',
-                                             np.where(df['Next_Change_From_Open'] < 0, 'red', 'flat'))
+    # Candle direction comes out of the kernel; its masks are built once and
+    # shared by the open stats, candle counts and pullback counts
+    green_open_mask = candle_direction == 1
+    red_open_mask = candle_direction == -1
 
+    # Pullback analysis when threshold is provided
+    if pullback_threshold is not None:
         # Filter based on threshold and type
         if pullback_type == "body":
-            threshold_condition = df['Body_Pct'] >= pullback_threshold
+            threshold_condition = body_pct >= pullback_threshold
         else:  # candle (total range)
-            threshold_condition = df['Range_Pct'] >= pullback_threshold
-
-
-        # Green candle pullback (how low next candle goes)
-        green_threshold_mask = threshold_condition & (df['Candle_Direction'] == 'green')
-
-        # Calculate pullback for green candles - use next candle's low
-        df['Green_Pullback_Points'] = np.where(
-            green_threshold_mask,
-            # np.where(df['Next_Candle_Direction'] == 'red',  # Only if next candle is red
-            #          df['Close'] - df['Next_Low'],  # How much it pulled back down
-            #          0),  # If next candle is green, no pullback
-            df['Next_Low'] - df['Close'],
-            np.nan
-        )
-        df['Green_Pullback_Pct'] = np.where(
-            green_threshold_mask,
-            # np.where(df['Next_Candle_Direction'] == 'red',
-            #          ((df['Next_Low'] - df['Close']) / df['Close']) * 100,
-            #          0),
-            ((df['Next_Low'] - df['Close']) / df['Close']) * 100,
-            np.nan
-        )
-
-        # Red candle pullback (how high next candle goes)
-        red_threshold_mask = threshold_condition & (df['Candle_Direction'] == 'red')
-
-        df['Red_Pullback_Points'] = np.where(
-            red_threshold_mask,
-            # np.where(df['Next_Candle_Direction'] == 'green',  # Only if next candle is green
-            #          df['Next_High'] - df['Close'],  # How much it pulled back up
-            #          0),  # If next candle is red, no pullback
-            df['Next_High'] - df['Close'],
-            np.nan
-        )
-        df['Red_Pullback_Pct'] = np.where(
-            red_threshold_mask,
-            # np.where(df['Next_Candle_Direction'] == 'green',
-            #          ((df['Next_High'] - df['Close']) / df['Close']) * 100,
-            #          0),
-            ((df['Next_High'] - df['Close']) / df['Close']) * 100,
-            np.nan
-        )
-
-    # Calculate statistics
-    stats = {}
-
-
-    # Range statistics (always positive)
-    stats.update(calc_stats(df['Range_Points'], 'range_points', is_always_positive=True))
-    stats.update(calc_stats(df['Range_Pct'], 'range_pct', is_always_positive=True))
-
-    # Body statistics (always positive)
-    stats.update(calc_stats(df['Body_Points'], 'body_points', is_always_positive=True))
-    stats.update(calc_stats(df['Body_Pct'], 'body_pct', is_always_positive=True))
-
-    # Net change statistics (can be positive or negative)
-    stats.update(calc_stats(df['Net_Change_Points'], 'net_change_points', is_always_positive=False))
-    stats.update(calc_stats(df['Net_Change_Pct'], 'net_change_pct', is_always_positive=False))
-
-    # Gap up statistics (always positive when they exist)
-    gap_up_data = df[df['Gap_Points'] > 0]
-    if not gap_up_data.empty:
-        stats.update(calc_stats(gap_up_data['Gap_Up_Points'], 'gap_up_points', is_always_positive=True))
-        stats.update(calc_stats(gap_up_data['Gap_Up_Pct'], 'gap_up_pct', is_always_positive=True))
-    else:
-        for suffix in ['min', 'max', 'avg', 'std', '1std_lower', '1std_upper', '2std_lower', '2std_upper', '3std_lower', '3std_upper']:
-            stats[f'gap_up_points_{suffix}'] = 0
-            stats[f'gap_up_pct_{suffix}'] = 0
-
-    # Gap down statistics (always positive when they exist)
-    gap_down_data = df[df['Gap_Points'] < 0]
-    if not gap_down_data.empty:
-        stats.update(calc_stats(gap_down_data['Gap_Down_Points'], 'gap_down_points', is_always_positive=True))
-        stats.update(calc_stats(gap_down_data['Gap_Down_Pct'], 'gap_down_pct', is_always_positive=True))
-    else:
-        for suffix in ['min', 'max', 'avg', 'std', '1std_lower', '1std_upper', '2std_lower', '2std_upper', '3std_lower', '3std_upper']:
-            stats[f'gap_down_points_{suffix}'] = 0
-            stats[f'gap_down_pct_{suffix}'] = 0
-
-    # Green candles from previous close (always positive when they exist)
-    green_prev_data = df[df['Change_From_Prev_Close_Points'] > 0]
-    if not green_prev_data.empty:
-        stats.update(calc_stats(green_prev_data['Green_From_Prev_Points'], 'green_prev_points', is_always_positive=True))
-        stats.update(calc_stats(green_prev_data['Green_From_Prev_Pct'], 'green_prev_pct', is_always_positive=True))
-    else:
-        for suffix in ['min', 'max', 'avg', 'std', '1std_lower', '1std_upper', '2std_lower', '2std_upper', '3std_lower', '3std_upper']:
-            stats[f'green_prev_points_{suffix}'] = 0
-            stats[f'green_prev_pct_{suffix}'] = 0
-
-    # Red candles from previous close (always positive when they exist)
-    red_prev_data = df[df['Change_From_Prev_Close_Points'] < 0]
-    if not red_prev_data.empty:
-        stats.update(calc_stats(red_prev_data['Red_From_Prev_Points'], 'red_prev_points', is_always_positive=True))
-        stats.update(calc_stats(red_prev_data['Red_From_Prev_Pct'], 'red_prev_pct', is_always_positive=True))
-    else:
-        for suffix in ['min', 'max', 'avg', 'std', '1std_lower', '1std_upper', '2std_lower', '2std_upper', '3std_lower', '3std_upper']:
-            stats[f'red_prev_points_{suffix}'] = 0
-            stats[f'red_prev_pct_{suffix}'] = 0
-
-    # Green candles from current open (always positive when they exist)
-    green_open_data = df[df['Change_From_Open_Points'] > 0]
-    if not green_open_data.empty:
-        stats.update(calc_stats(green_open_data['Green_From_Open_Points'], 'green_open_points', is_always_positive=True))
-        stats.update(calc_stats(green_open_data['Green_From_Open_Pct'], 'green_open_pct', is_always_positive=True))
-    else:
-        for suffix in ['min', 'max', 'avg', 'std', '1std_lower', '1std_upper', '2std_lower', '2std_upper', '3std_lower', '3std_upper']:
-            stats[f'green_open_points_{suffix}'] = 0
-            stats[f'green_open_pct_{suffix}'] = 0
-
-    # Red candles from current open (always positive when they exist)
-    red_open_data = df[df['Change_From_Open_Points'] < 0]
-    if not red_open_data.empty:
-        stats.update(calc_stats(red_open_data['Red_From_Open_Points'], 'red_open_points', is_always_positive=True))
-        stats.update(calc_stats(red_open_data['Red_From_Open_Pct'], 'red_open_pct', is_always_positive=True))
-    else:
-        for suffix in ['min', 'max', 'avg', 'std', '1std_lower', '1std_upper', '2std_lower', '2std_upper', '3std_lower', '3std_upper']:
-            stats[f'red_open_points_{suffix}'] = 0
-            stats[f'red_open_pct_{suffix}'] = 0
+            threshold_condition = range_pct >= pullback_threshold
+
+        green_threshold_mask = threshold_condition & green_open_mask
+        red_threshold_mask = threshold_condition & red_open_mask
+
+    # (name, values, subset mask or None for every candle, sign, always positive)
+    metric_specs = [
+        # Range, body and net change (close - previous close) use every candle
+        ('range_points', range_pts, None, 1, True),
+        ('range_pct', range_pct, None, 1, True),
+        ('body_points', body_pts, None, 1, True),
+        ('body_pct', body_pct, None, 1, True),
+        ('net_change_points', change_prev_pts, None, 1, False),
+        ('net_change_pct', change_prev_pct, None, 1, False),
+
+        # Directional subsets (always positive when they exist)
+        ('gap_up_points', gap_pts, gap_up_mask, 1, True),
+        ('gap_up_pct', gap_pct, gap_up_mask, 1, True),
+        ('gap_down_points', gap_pts, gap_down_mask, -1, True),
+        ('gap_down_pct', gap_pct, gap_down_mask, -1, True),
+        ('green_prev_points', change_prev_pts, green_prev_mask, 1, True),
+        ('green_prev_pct', change_prev_pct, green_prev_mask, 1, True),
+        ('red_prev_points', change_prev_pts, red_prev_mask, -1, True),
+        ('red_prev_pct', change_prev_pct, red_prev_mask, -1, True),
+        ('green_open_points', change_open_pts, green_open_mask, 1, True),
+        ('green_open_pct', change_open_pct, green_open_mask, 1, True),
+        ('red_open_points', change_open_pts, red_open_mask, -1, True),
+        ('red_open_pct', change_open_pct, red_open_mask, -1, True),
+    ]
+
+    # Pullbacks can go either way (pullback or continuation)
+    if pullback_threshold is not None:
+        metric_specs += [
+            ('green_pullback_points', green_pullback_pts, None, 1, False),
+            ('green_pullback_pct', green_pullback_pct, None, 1, False),
+            ('red_pullback_points', red_pullback_pts, None, 1, False),
+            ('red_pullback_pct', red_pullback_pct, None, 1, False),
+        ]
+
+    # Calculate statistics for every metric in a single vectorized pass
+    stats = reduce_metrics(metric_specs)
 
-    # Pullback statistics when threshold is provided
     if pullback_threshold is not None:
-        # Green candle pullback statistics
-        green_pullback_data = df['Green_Pullback_Points'].replace([np.inf, -np.inf], np.nan).dropna()
-        if len(green_pullback_data) > 0:
-            stats.update(calc_stats(green_pullback_data, 'green_pullback_points'))
-            stats.update(calc_stats(df['Green_Pullback_Pct'].replace([np.inf, -np.inf], np.nan).dropna(), 'green_pullback_pct'))
-            stats['green_pullback_count'] = len(green_pullback_data)
-        else:
-            for suffix in ['min', 'max', 'avg', 'std', '1std_lower', '1std_upper', '2std_lower', '2std_upper', '3std_lower', '3std_upper']:
-                stats[f'green_pullback_points_{suffix}'] = 0
-                stats[f'green_pullback_pct_{suffix}'] = 0
-            stats['green_pullback_count'] = 0
-
-        # Red candle pullback statistics
-        red_pullback_data = df['Red_Pullback_Points'].replace([np.inf, -np.inf], np.nan).dropna()
-        if len(red_pullback_data) > 0:
-            stats.update(calc_stats(red_pullback_data, 'red_pullback_points'))
-            stats.update(calc_stats(df['Red_Pullback_Pct'].replace([np.inf, -np.inf], np.nan).dropna(), 'red_pullback_pct'))
-            stats['red_pullback_count'] = len(red_pullback_data)
-        else:
-            for suffix in ['min', 'max', 'avg', 'std', '1std_lower', '1std_upper', '2std_lower', '2std_upper', '3std_lower', '3std_upper']:
-                stats[f'red_pullback_points_{suffix}'] = 0
-                stats[f'red_pullback_pct_{suffix}'] = 0
-            stats['red_pullback_count'] = 0
+        # Points and pct share one NaN pattern, so one validity mask per side gives the count
+        green_pullback_valid = np.isfinite(green_pullback_pts)
+        red_pullback_valid = np.isfinite(red_pullback_pts)
+        stats['green_pullback_count'] = int(np.count_nonzero(green_pullback_valid))
+        stats['red_pullback_count'] = int(np.count_nonzero(red_pullback_valid))
 
         # Count of candles meeting threshold criteria
-        stats['green_threshold_count'] = len(df[threshold_condition & (df['Candle_Direction'] == 'green')])
-        stats['red_threshold_count'] = len(df[threshold_condition & (df['Candle_Direction'] == 'red')])
+        stats['green_threshold_count'] = int(green_threshold_mask.sum())
+        stats['red_threshold_count'] = int(red_threshold_mask.sum())
 
     # Additional interesting statistics
-    stats['total_candles'] = len(df)
-    stats['green_candles_count'] = len(green_open_data)
-    stats['red_candles_count'] = len(red_open_data)
+    stats['total_candles'] = len(range_pts)
+    stats['green_candles_count'] = int(np.count_nonzero(green_open_mask))
+    stats['red_candles_count'] = int(np.count_nonzero(red_open_mask))
     stats['flat_candles_count'] = stats['total_candles'] - stats['green_candles_count'] - stats['red_candles_count']
     stats['green_candles_percentage'] = (stats['green_candles_count'] / stats['total_candles']) * 100 if stats['total_candles'] > 0 else 0
-    stats['gap_up_candles'] = len(gap_up_data)
-    stats['gap_down_candles'] = len(gap_down_data)
+    stats['gap_up_candles'] = int(np.count_nonzero(gap_up_mask))
+    stats['gap_down_candles'] = int(np.count_nonzero(gap_down_mask))
     stats['no_gap_candles'] = stats['total_candles'] - stats['gap_up_candles'] - stats['gap_down_candles']
 
     return stats
 
+# Statistics shown in each section table (std itself is not displayed)
+DISPLAY_SUFFIXES = tuple(suffix for suffix in STAT_SUFFIXES if suffix != 'std')
+# Numeric table columns are rendered to one decimal by the widget
+NUMBER_COLUMNS = {column: st.column_config.NumberColumn(format="%.1f")
+                  for column in ['Min', 'Max', 'Average']}
+
+# Section layout of the statistics page: section -> unit -> metric name
+SECTIONS = {
+    "Total Range (High - Low)": {
+        "Points": 'range_points',
+        "Percentage": 'range_pct'
+    },
+    "Body Range (|Close - Open|)": {
+        "Points": 'body_points',
+        "Percentage": 'body_pct'
+    },
+    "Net Change (Close - Previous Close)": {
+        "Points": 'net_change_points',
+        "Percentage": 'net_change_pct'
+    },
+    "Gap Up": {
+        "Points": 'gap_up_points',
+        "Percentage": 'gap_up_pct'
+    },
+    "Gap Down": {
+        "Points": 'gap_down_points',
+        "Percentage": 'gap_down_pct'
+    },
+    "Green Candles (from Previous Close)": {
+        "Points": 'green_prev_points',
+        "Percentage": 'green_prev_pct'
+    },
+    "Red Candles (from Previous Close)": {
+        "Points": 'red_prev_points',
+        "Percentage": 'red_prev_pct'
+    },
+    "Green Candles (from Current Open)": {
+        "Points": 'green_open_points',
+        "Percentage": 'green_open_pct'
+    },
+    "Red Candles (from Current Open)": {
+        "Points": 'red_open_points',
+        "Percentage": 'red_open_pct'
+    }
+}
+
+# Shown after the other sections when pullback analysis is enabled
+PULLBACK_SECTIONS = {
+    "Green Candle Pullback(-)/Continuation(+)": {
+        "Points": 'green_pullback_points',
+        "Percentage": 'green_pullback_pct'
+    },
+    "Red Candle Pullback(+)/Continuation(-)": {
+        "Points": 'red_pullback_points',
+        "Percentage": 'red_pullback_pct'
+    }
+}
+
+def section_rows(sections):
+    """Flatten a section layout into (section names, units, stat keys), one row per unit"""
+    rows = [(section_name, unit, tuple(f'{key_prefix}_{suffix}' for suffix in DISPLAY_SUFFIXES))
+            for section_name, section_data in sections.items()
+            for unit, key_prefix in section_data.items()]
+    return tuple(zip(*rows))
+
+# Row layouts are fixed, so they are built once at import rather than on every render
+SECTION_ROWS = section_rows(SECTIONS)
+PULLBACK_SECTION_ROWS = section_rows({**SECTIONS, **PULLBACK_SECTIONS})
+
 def display_statistics_table(stats, title, show_pullback=False, pullback_threshold=None, pullback_type=None):
     """Display statistics in a formatted table with std ranges"""
     if not stats:
@@ -350,79 +449,35 @@ def display_statistics_table(stats, title, show_pullback=False, pullback_thresho
 
     st.subheader(title)
 
-    # Create organized sections
-    sections = {
-        "Total Range (High - Low)": {
-            "Points": 'range_points',
-            "Percentage": 'range_pct'
-        },
-        "Body Range (|Close - Open|)": {
-            "Points": 'body_points',
-            "Percentage": 'body_pct'
-        },
-        "Net Change (Close - Previous Close)": {
-            "Points": 'net_change_points',
-            "Percentage": 'net_change_pct'
-        },
-        "Gap Up": {
-            "Points": 'gap_up_points',
-            "Percentage": 'gap_up_pct'
-        },
-        "Gap Down": {
-            "Points": 'gap_down_points',
-            "Percentage": 'gap_down_pct'
-        },
-        "Green Candles (from Previous Close)": {
-            "Points": 'green_prev_points',
-            "Percentage": 'green_prev_pct'
-        },
-        "Red Candles (from Previous Close)": {
-            "Points": 'red_prev_points',
-            "Percentage": 'red_prev_pct'
-        },
-        "Green Candles (from Current Open)": {
-            "Points": 'green_open_points',
-            "Percentage": 'green_open_pct'
-        },
-        "Red Candles (from Current Open)": {
-            "Points": 'red_open_points',
-            "Percentage": 'red_open_pct'
-        }
-    }
-
-    # Add pullback sections if requested
+    # Pick the precomputed row layout for this view
     if show_pullback and pullback_threshold is not None:
-        pullback_sections = {
-            "Green Candle Pullback(-)/Continuation(+)": {
-                "Points": 'green_pullback_points',
-                "Percentage": 'green_pullback_pct'
-            },
-            "Red Candle Pullback(+)/Continuation(-)": {
-                "Points": 'red_pullback_points',
-                "Percentage": 'red_pullback_pct'
-            }
-        }
-        sections.update(pullback_sections)
-
-    for section_name, section_data in sections.items():
+        section_names, units, stat_keys = PULLBACK_SECTION_ROWS
+    else:
+        section_names, units, stat_keys = SECTION_ROWS
+    values = np.array([[stats.get(key, 0) for key in keys] for keys in stat_keys],
+                      dtype=np.float64)
+
+    # Min/Max/Average stay numeric (sortable in the widget); the std range bounds are
+    # formatted in one vectorized call - columns follow DISPLAY_SUFFIXES
+    text = np.char.mod('%.1f', values[:, 3:])
+    ranges = np.char.add(np.char.add(text[:, 0::2], ' to '), text[:, 1::2])
+
+    table = pd.DataFrame({
+        'Section': section_names,
+        'Metric': units,
+        'Min': values[:, 0],
+        'Max': values[:, 1],
+        'Average': values[:, 2],
+        '1σ Range': ranges[:, 0],
+        '2σ Range': ranges[:, 1],
+        '3σ Range': ranges[:, 2]
+    })
+
+    # Each section is a slice of the shared table
+    for section_name, df_section in table.groupby('Section', sort=False):
         st.write(f"**{section_name}**")
-
-        # Create DataFrame for this section
-        rows = []
-        for unit, key_prefix in section_data.items():
-            row = {
-                'Metric': unit,
-                'Min': f"{stats.get(f'{key_prefix}_min', 0):.1f}",
-                'Max': f"{stats.get(f'{key_prefix}_max', 0):.1f}",
-                'Average': f"{stats.get(f'{key_prefix}_avg', 0):.1f}",
-                '1σ Range': f"{stats.get(f'{key_prefix}_1std_lower', 0):.1f} to {stats.get(f'{key_prefix}_1std_upper', 0):.1f}",
-                '2σ Range': f"{stats.get(f'{key_prefix}_2std_lower', 0):.1f} to {stats.get(f'{key_prefix}_2std_upper', 0):.1f}",
-                '3σ Range': f"{stats.get(f'{key_prefix}_3std_lower', 0):.1f} to {stats.get(f'{key_prefix}_3std_upper', 0):.1f}"
-            }
-            rows.append(row)
-
-        df_section = pd.DataFrame(rows)
-        st.dataframe(df_section, hide_index=True)
+        st.dataframe(df_section.drop(columns='Section'), hide_index=True,
+                     column_config=NUMBER_COLUMNS)
         st.write("")
 
 def main():
@@ -500,15 +555,16 @@ def main():
         if symbol and start_date < end_date:
             with st.spinner("Loading and analyzing data..."):
                 # Load data
-                data = load_data(symbol, start_date, end_date)
+                data = session_data(symbol, start_date, end_date)
 
                 if data is not None and not data.empty:
                     # Resample if needed
                     if frequency != "Daily":
                         data = resample_data(data, frequency, start_day)
 
-                    # Calculate statistics
-                    stats = calculate_statistics(data, start_date, end_date, pullback_threshold, pullback_type)
+                    # Calculate statistics on plain arrays - pandas stays at the I/O edges
+                    stats = calculate_statistics(data.index, *price_arrays(data), start_date, end_date,
+                                                 pullback_threshold, pullback_type)
 
                     if stats:
                         # Display summary metrics
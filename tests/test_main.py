@@ -0,0 +1,68 @@
+import sys
+import types
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+from streamlit.testing.v1 import AppTest
+
+APP = str(Path(__file__).resolve().parent.parent / 'main.py')
+
+
+def fake_download(symbols, start, end, **kwargs):
+    """Deterministic daily OHLCV bars in yf.download's group_by='ticker' layout"""
+    index = pd.bdate_range(start, end, inclusive='left', name='Date')
+    rng = np.random.default_rng(0)
+    frames = {}
+    for symbol in symbols:
+        close = 100 + rng.standard_normal(len(index)).cumsum()
+        open_ = close + rng.standard_normal(len(index))
+        frames[symbol.upper()] = pd.DataFrame({
+            'Open': open_,
+            'High': np.maximum(open_, close) + 1,
+            'Low': np.minimum(open_, close) - 1,
+            'Close': close,
+            'Volume': 1000.0
+        }, index=index)
+    return pd.concat(frames, axis=1)
+
+
+def run_analyze(monkeypatch, frequency="Daily", pullback=False):
+    monkeypatch.setitem(sys.modules, 'yfinance', types.SimpleNamespace(download=fake_download))
+    at = AppTest.from_file(APP, default_timeout=60).run()
+    at.selectbox[1].select(frequency).run()
+    if pullback:
+        at.checkbox[0].check().run()
+    at.button[0].click().run()
+    return at
+
+
+def test_analyze_daily(monkeypatch):
+    at = run_analyze(monkeypatch)
+    assert not at.exception
+    assert not at.error
+    assert at.metric[0].value not in ('', '0')
+    assert len(at.dataframe) == 9
+
+
+def test_analyze_weekly_with_pullback(monkeypatch):
+    at = run_analyze(monkeypatch, frequency="Weekly", pullback=True)
+    assert not at.exception
+    assert not at.error
+    assert len(at.dataframe) == 11
+
+
+def test_monthly_start_day_ignores_dst(monkeypatch):
+    monkeypatch.syspath_prepend(str(Path(APP).parent))
+    import main
+
+    index = pd.bdate_range('2023-02-01', '2023-04-28', tz='America/New_York', name='Date')
+    prices = np.arange(len(index), dtype=float)
+    data = pd.DataFrame({'Open': prices, 'High': prices, 'Low': prices,
+                         'Close': prices, 'Volume': 1.0}, index=index)
+
+    resampled = main.resample_data(data, "Monthly", 15)
+    march = pd.Timestamp('2023-03-15', tz='America/New_York')
+    # The bar on the 15th opens its month even though DST started on March 12
+    assert march in resampled.index
+    assert resampled.loc[march, 'Open'] == data.loc[march, 'Open']